@@ -5,13 +5,16 @@ Exceptions:
     FormatError   -- Error for incorrect formatting
 
 Classes:
-    Cat    -- represents a category of phonemes
-    Word   -- represents a run of text
-    Config -- collection of gen.py configuration data
+    Cat       -- represents a category of phonemes
+    Word      -- represents a run of text
+    Automaton -- finds many sequences of graphemes in a single pass
+    Config    -- collection of gen.py configuration data
 
 Functions:
-    parse_syms -- parses a string using pattern notation
-    split      -- splits a string
+    get_polygraphs -- picks out the polygraphs from a collection of graphemes
+    poly_tables    -- builds lookup tables for disambiguating polygraphs
+    parse_syms     -- parses a string using pattern notation
+    split          -- splits a string
 ''''''
 ==================================== To-do ====================================
 === Bug-fixes ===
@@ -30,8 +33,13 @@ Implement cat subsets - maybe?
 Consider where to raise/handle exceptions
 '''
 
-from collections import namedtuple
+from collections import deque, namedtuple
+from functools import lru_cache
 from string import whitespace
+from sys import intern
+
+#== Constants ==#
+BRACKET_SPACING = str.maketrans({char: f' {char} ' for char in '([{}])'}) #for separating brackets from their contents
 
 #== Exceptions ==#
 class LangException(Exception):
@@ -59,18 +67,19 @@ class Cat(list):
         if values is None:
             values = []
         elif isinstance(values, str): #we want an iteratible with each value as an element
-            values = split(values, ',', minimal=True)
+            values = [value for value in values.split(',') if value]
         for value in values:
             if isinstance(value, Cat): #another category
-                _values.extend(value.values)
+                _values.extend(value)
             elif '[' in value:
                 if cats is not None and value.strip('[]') in cats:
                     _values.extend(cats[value.strip('[]')])
                 else:
                     continue
             else:
-                _values.append(value)
+                _values.append(intern(value))
         list.__init__(self, _values)
+        self._members = frozenset(_values) #categories aren't modified once built, so membership can be looked up directly
     
     def __repr__(self):
         return f"Cat('{self!s}')"
@@ -78,11 +87,63 @@ class Cat(list):
     def __str__(self):
         return ', '.join(self)
     
+    def __contains__(self, value):
+        return value in self._members
+    
+    #anything that changes the values must refresh the set used for membership
+    def __setitem__(self, key, value):
+        list.__setitem__(self, key, value)
+        self._members = frozenset(self)
+    
+    def __delitem__(self, key):
+        list.__delitem__(self, key)
+        self._members = frozenset(self)
+    
+    def __iadd__(self, values):
+        list.__iadd__(self, values)
+        self._members = frozenset(self)
+        return self
+    
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self._members = frozenset(self)
+        return self
+    
+    def append(self, value):
+        list.append(self, value)
+        self._members = frozenset(self)
+    
+    def extend(self, values):
+        list.extend(self, values)
+        self._members = frozenset(self)
+    
+    def insert(self, index, value):
+        list.insert(self, index, value)
+        self._members = frozenset(self)
+    
+    def remove(self, value):
+        list.remove(self, value)
+        self._members = frozenset(self)
+    
+    def pop(self, index=-1):
+        value = list.pop(self, index)
+        self._members = frozenset(self)
+        return value
+    
+    def clear(self):
+        list.clear(self)
+        self._members = frozenset(self)
+    
+    def __add__(self, cat):
+        return Cat(list(self)+list(cat))
+    
     def __and__(self, cat):
+        cat = set(cat) #so that each membership test is O(1)
         values = [value for value in self if value in cat]
         return Cat(values)
     
     def __sub__(self, cat):
+        cat = set(cat)
         values = [value for value in self if value not in cat]
         return Cat(values)
 
@@ -91,15 +152,22 @@ class Word():
     
     Instance variables:
         sep        -- a character used to disambiguate polygraphs from sequences (chr)
-        polygraphs -- a list of multi-letter graphemes (list)
+        polygraphs -- the multi-letter graphemes (tuple)
         phones     -- a list of the graphemes in the word (list)
         syllables  -- a list of tuples representing syllables (list)
+        changed    -- whether a replacement has changed the graphemes since this was last cleared (bool)
     
     Methods:
-        find      -- match a list using pattern notation to the word
-        match_env -- match a sound change environment to the word
-        strip     -- remove leading and trailing graphemes
+        find             -- match a list using pattern notation to the word
+        find_all_literal -- find every occurrence of a list of graphemes in the word
+        match            -- match a list using pattern notation to the word at a given position
+        match_env        -- match a sound change environment to the word
+        replace          -- replace a run of the word
+        replace_all      -- replace several runs of the word at once
+        strip            -- remove leading and trailing graphemes
     '''
+    __slots__ = ('sep', 'polygraphs', 'phones', 'syllables', 'changed') #there may be a great many words, so keep them compact
+    
     def __init__(self, lexeme=None, syllables=None, graphs=None):
         '''Constructor for Word
         
@@ -111,35 +179,32 @@ class Word():
         if graphs is None:
             graphs = ["'"]
         self.sep = graphs[0]
-        self.polygraphs = [g for g in graphs if len(g)>1]
+        self.polygraphs = get_polygraphs(tuple(graphs))
         if lexeme is None:
             self.phones = []
-        elif isinstance(lexeme, list):
-            self.phones = lexeme
+        elif isinstance(lexeme, list): #graphemes are interned, so that comparing them is usually an identity check
+            self.phones = [intern(graph) for graph in lexeme]
         else:
             self.phones = parse_word(f' {lexeme} ', self.sep, self.polygraphs)
         self.syllables = syllables #do a bit of sanity checking here
+        self.changed = False
     
     def __repr__(self):
         return f"Word('{self!s}')"
     
     def __str__(self):
+        infixes, containers = poly_tables(self.polygraphs)
         word = curr = ''
         for graph in self.phones:
             curr += graph
-            for poly in self.polygraphs:
-                if graph in poly and graph != poly:
-                    break
-            else:
+            if graph not in infixes:
                 curr = ''
-            for poly in self.polygraphs:
-                if curr in poly:
-                    if curr == poly:
-                        word += self.sep
-                        curr = graph
-                    break
-            else:
+            poly = containers.get(curr)
+            if poly is None:
                 curr = curr[1:]
+            elif curr == poly: #these graphemes would be read back as a polygraph
+                word += self.sep
+                curr = graph
             word += graph
         return word.strip(self.sep+'#').replace('#',' ')
     
@@ -185,26 +250,18 @@ class Word():
         return Word(self.phones, self.syllables)
     
     def reverse(self):
-        self.phones.reverse()
+        self.phones = self.phones[::-1]
     
     def strip(self, chars=None):
-        phones = self.phones.copy()
+        phones = self.phones
         if chars is None:
             chars = '#'
-        for i in range(len(phones)):
-            if phones[i] in chars:
-                phones[i] = None
-            else:
-                break
-        for i in reversed(range(len(phones))):
-            if phones[i] in chars:
-                phones[i] = None
-            else:
-                break
-        for i in reversed(range(len(phones))):
-            if phones[i] == None:
-                del phones[i]
-        return Word(phones)
+        start, end = 0, len(phones)
+        while start < end and phones[start] in chars:
+            start += 1
+        while end > start and phones[end-1] in chars:
+            end -= 1
+        return Word(phones[start:end]) #slice once, rather than blanking graphemes and deleting them one by one
     
     def find(self, sub, start=None, end=None, return_match=False):
         '''Match a sequence using pattern notation to the word.
@@ -213,8 +270,9 @@ class Word():
             sub   -- the list to be found (list)
             start -- the index of the beginning of the range to check (int)
             end   -- the index of the end of the range to check (int)
+            return_match -- whether to also return the matched graphemes (bool)
         
-        Returns an int
+        Returns an int, or a tuple of an int and a list if return_match is True
         '''
         if start is None:
             start = 0
@@ -225,8 +283,24 @@ class Word():
         elif end < 0:
             end += len(self)
         if isinstance(sub, Word):
-            sub = sub.strip() #we want to strip out the leading and trailing '#'s so that this works like finding substrings
-        for i in range(0, end-start):
+            sub = sub.strip().phones #we want to strip out the leading and trailing '#'s so that this works like finding substrings
+        phones = self.phones #index the graphemes directly, rather than building a new Word for each slice
+        if sub and isinstance(sub[0], str) and sub[0] != '*':
+            first = sub[0] #matches can only start where this grapheme is
+        else:
+            first = None
+        if first is not None and all(isinstance(sym, str) and sym != '*' for sym in sub): #only graphemes, so compare whole slices
+            i = next(self.find_all_literal(sub, start, end), -1)
+            if i == -1:
+                return (-1, []) if return_match else -1
+            return (i-start, phones[i:i+len(sub)]) if return_match else i-start
+        i = 0
+        while i < end-start:
+            if first is not None: #skip straight to the next candidate, scanning in C rather than Python
+                try:
+                    i = phones.index(first, i+start, end) - start
+                except ValueError:
+                    break
             j = i + start #position in the word
             for k, sym in enumerate(sub):
                 if j >= end: #we've reached the end of the slice, so the find fails
@@ -236,25 +310,79 @@ class Word():
                     if return_match:
                         index, match = index
                     if index == 0: #try with the optional sequence
-                        return (i, self[i+start:j]+match) if return_match else i
+                        return (i, phones[i+start:j]+match) if return_match else i
                     j -= 1 #if this fails, we jump back to where we were
                 elif isinstance(sym, Cat): #category
-                    if not self[j] in sym: #this may change - definitely if categories are allowed to contain sequences
+                    if not phones[j] in sym: #this may change - definitely if categories are allowed to contain sequences
                         break
                 elif sym == '*': #wildcard
                     index = self.find(sub[k+1:],j, end, return_match)
                     if return_match:
                         index, match = index
                     if index != -1: #only fails if the rest of the sequence is nowhere present
-                        return (i, self[i+start:index+j]+match) if return_match else i
+                        return (i, phones[i+start:index+j]+match) if return_match else i
                     break
-                elif self[j] != sym: #grapheme
+                elif phones[j] != sym: #grapheme
                     break
                 j += 1
             else:
-                return (i, self[i+start:j]) if return_match else i
-        else:
-            return (-1, []) if return_match else -1
+                return (i, phones[i+start:j]) if return_match else i
+            i += 1
+        return (-1, []) if return_match else -1
+    
+    def find_all_literal(self, sub, start=0, end=None):
+        '''Find every occurrence of a sequence of graphemes in the word, skipping between occurrences of its first grapheme.
+        
+        Arguments:
+            sub   -- the graphemes to be found, with no pattern notation (list)
+            start -- the index of the beginning of the range to check (int)
+            end   -- the index of the end of the range to check (int)
+        
+        Yields the index of each occurrence, including overlapping ones, in order
+        '''
+        phones, sub = self.phones, list(sub)
+        if end is None:
+            end = len(phones)
+        if not sub:
+            return
+        first, length = sub[0], len(sub)
+        i = start
+        while True:
+            try:
+                i = phones.index(first, i, end-length+1)
+            except ValueError: #no more occurrences
+                return
+            if phones[i:i+length] == sub:
+                yield i
+            i += 1
+    
+    def match(self, sub, pos=0, step=1):
+        '''Match a sequence using pattern notation to the word at a fixed position.
+        
+        Arguments:
+            sub  -- the list to be matched (list)
+            pos  -- the index of the first grapheme to be checked (int)
+            step -- the direction to match in; 1 for rightwards, -1 for leftwards (int)
+        
+        Returns a bool
+        '''
+        for k, sym in enumerate(sub):
+            if isinstance(sym, tuple): #optional sequence
+                if self.match(list(sym)+sub[k+1:], pos, step): #try with the optional sequence
+                    return True
+                continue #if this fails, carry on from where we were
+            elif sym == '*': #wildcard
+                stop = len(self)+1 if step > 0 else -2
+                return any(self.match(sub[k+1:], i, step) for i in range(pos, stop, step))
+            elif not 0 <= pos < len(self): #we've run off the edge of the word
+                return False
+            elif isinstance(sym, Cat): #category
+                if self.phones[pos] not in sym:
+                    return False
+            elif self.phones[pos] != sym: #grapheme
+                return False
+            pos += step
+        return True
     
     def match_env(self, env, pos=0, tar=None): #test if the env matches the word
         '''Match a sound change environment to the word.
@@ -276,27 +404,161 @@ class Word():
                 env[i:i+1] = reversed(tar)
         if len(env) == 1:
             return env[0] in self
-        else:
-            if pos:
-                matchLeft = self[::-1].find(env[0],-pos)
-            else: #at the left edge, which can only be matched by a null env
-                matchLeft = -1 if env[0] else 0
-            matchRight = self.find(env[1], pos+len(tar))
-            return matchLeft == matchRight == 0
+        else: #env[0] is stored reversed, so it is matched leftwards from just before the target
+            return self.match(env[0], pos-1, -1) and self.match(env[1], pos+len(tar))
     
     def replace(self, start, tar, rep):
-        rep = rep.copy()
-        for i in reversed(range(len(rep))):
-            if rep[i] == '%': #target copying
-                rep[i:i+1] = tar
-            elif rep[i] == '<': #target reversal/metathesis
-                rep[i:i+1] = reversed(tar)
-        self[start:start+len(tar)] = rep
+        self.replace_all([(start, tar, rep)])
+        return
+    
+    def replace_all(self, reps):
+        '''Replace several runs of the word at once, building the new list of graphemes in a single pass.
+        
+        Arguments:
+            reps -- tuples of the index each run starts at, the graphemes in it, and their replacement, in order and not overlapping (list)
+        
+        The word's list of graphemes is never mutated in place; it is only rebound, and only if a run actually changed.
+        '''
+        phones = []
+        changed = False
+        end = 0
+        for start, tar, rep in reps:
+            phones += self.phones[end:start]
+            if '%' not in rep and '<' not in rep: #plain graphemes can be spliced in without walking them
+                run = rep
+            else:
+                run = []
+                for graph in rep:
+                    if graph == '%': #target copying
+                        run += tar
+                    elif graph == '<': #target reversal/metathesis
+                        run += reversed(tar)
+                    else:
+                        run.append(graph)
+            end = start+len(tar)
+            if not changed and run != self.phones[start:end]: #only the replaced run needs checking
+                changed = True
+            phones += run
+        if changed:
+            phones += self.phones[end:]
+            self.phones = phones
+            self.changed = True
         return
 
+class Automaton():
+    '''Represents an Aho-Corasick automaton, for finding many sequences of graphemes in a single pass.
+    
+    Instance variables:
+        goto   -- the transitions out of each state (list)
+        fail   -- the state to fall back to from each state (list)
+        output -- the keys and lengths of the sequences ending at each state (list)
+        keys   -- the distinct keys of the sequences ending at each state (list)
+    
+    Methods:
+        find_all  -- find every occurrence of every sequence in a list of graphemes
+        find_keys -- find the keys of every sequence occurring in a list of graphemes
+    '''
+    def __init__(self, patterns=None):
+        '''Constructor for Automaton
+        
+        Arguments:
+            patterns -- pairs of a sequence of graphemes and the key to report it by (list)
+        '''
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        if patterns is None:
+            patterns = []
+        for seq, key in patterns: #build the trie
+            state = 0
+            for graph in seq:
+                if graph not in self.goto[state]:
+                    self.goto[state][graph] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = self.goto[state][graph]
+            self.output[state].append((key, len(seq)))
+        queue = deque(self.goto[0].values()) #add the failure links breadth-first, so shallower states are always done first
+        while queue:
+            state = queue.popleft()
+            for graph, child in self.goto[state].items():
+                queue.append(child)
+                fail = self.fail[state]
+                while fail and graph not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(graph, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        self.keys = [frozenset(key for key, length in output) for output in self.output] #a key may end at a state more than once
+    
+    def find_all(self, phones):
+        '''Find every occurrence of every sequence in a list of graphemes.
+        
+        Arguments:
+            phones -- the graphemes to search (list)
+        
+        Yields tuples of the index each occurrence starts at and its key, in order of where they end
+        '''
+        state = 0
+        for end, graph in enumerate(phones, 1):
+            while state and graph not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(graph, 0)
+            for key, length in self.output[state]:
+                yield end-length, key
+    
+    def find_keys(self, phones):
+        '''Find the keys of every sequence occurring in a list of graphemes.
+        
+        Arguments:
+            phones -- the graphemes to search (list)
+        
+        Returns a set
+        '''
+        goto, fail = self.goto, self.fail
+        states = set() #each state reached is only looked up once, however many times it is reached
+        state = 0
+        for graph in phones:
+            while state and graph not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(graph, 0)
+            states.add(state)
+        return set().union(*[self.keys[state] for state in states])
+
 Config = namedtuple('Config', 'patterns, counts, constraints, freq, monofreq')
 
 #== Functions ==#
+@lru_cache(maxsize=None)
+def get_polygraphs(graphs):
+    '''Pick out the polygraphs from a collection of graphemes, so that words using the same graphemes can share them.
+    
+    Arguments:
+        graphs -- the graphemes (tuple)
+    
+    Returns a tuple
+    '''
+    return tuple(g for g in graphs if len(g)>1)
+
+@lru_cache(maxsize=None)
+def poly_tables(polygraphs):
+    '''Build lookup tables for disambiguating polygraphs.
+    
+    Arguments:
+        polygraphs -- the polygraphs to be disambiguated (tuple)
+    
+    Returns a tuple of a set of the strings found inside, but not equal to, some polygraph, and a dictionary mapping
+    each substring of a polygraph to the first polygraph containing it.
+    '''
+    infixes = set()
+    containers = {}
+    for poly in polygraphs:
+        for i in range(len(poly)+1):
+            for j in range(i, len(poly)+1):
+                if poly[i:j] != poly:
+                    infixes.add(poly[i:j])
+                containers.setdefault(poly[i:j], poly)
+    return infixes, containers
+
 def parse_syms(syms, cats=None):
     '''Parse a string using pattern notation.
     
@@ -308,26 +570,25 @@ def parse_syms(syms, cats=None):
     '''
     if cats is None:
         cats = {}
-    for char in '([{}])':
-        syms = syms.replace(char, f' {char} ')
-    syms = split(syms, ' ', nesting=(0, '([{','}])'), minimal=True)
-    for i in reversed(range(len(syms))):
-        syms[i] = syms[i].replace(' ','')
-        if not syms[i]:
-            del syms[i]
-        elif syms[i][0] == '(': #optional - parse to tuple
-            syms[i] = tuple(parse_syms(syms[i].strip('()'), cats))
-        elif syms[i][0] == '[': #category - parse to Cat
-            syms[i] = syms[i].strip('[]')
-            if ',' in syms[i]: #nonce cat
-                syms[i] = Cat(syms[i])
+    syms = syms.translate(BRACKET_SPACING) #pad brackets with spaces in one pass
+    result = [] #built in a single forward pass, rather than splicing each symbol into the list in place
+    for sym in split(syms, ' ', nesting=(0, '([{','}])'), minimal=True):
+        sym = sym.replace(' ','')
+        if not sym:
+            continue
+        elif sym[0] == '(': #optional - parse to tuple
+            result.append(tuple(parse_syms(sym.strip('()'), cats)))
+        elif sym[0] == '[': #category - parse to Cat
+            sym = sym.strip('[]')
+            if ',' in sym: #nonce cat
+                result.append(Cat(sym))
             else: #named cat
-                syms[i] = cats[syms[i]]
-        elif syms[i][0] == '{': #unimplemented - delete
-            del syms[i]
+                result.append(cats[sym])
+        elif sym[0] == '{': #unimplemented - discard
+            continue
         else: #text - parse as word
-            syms[i:i+1] = parse_word(syms[i])
-    return syms
+            result.extend(parse_word(sym))
+    return result
 
 def parse_word(word, sep="'", polygraphs=[]):
     '''Parse a string of graphemes.
@@ -347,7 +608,7 @@ def parse_word(word, sep="'", polygraphs=[]):
         while len(test) > 1 and not any(g.startswith(test) for g in polygraphs): #while test isn't a single character and doesn't begin any polygraph
             for i in reversed(range(1,len(test)+1)): #from i=len(test) to i=1
                 if i == 1 or test[:i] in polygraphs: #does test begin with a valid graph? Single characters are always valid
-                    graphemes.append(test[:i]) #add this valid graph to the output
+                    graphemes.append(intern(test[:i])) #add this valid graph to the output - interned so that comparisons are by identity
                     test = test[i:].lstrip(sep) #remove the graph from test, and remove leading instances of sep
                     break
     return graphemes
@@ -365,6 +626,10 @@ def split(string, sep=None, nesting=None, minimal=False):
     '''
     if sep is None:
         sep = whitespace
+    if len(sep) == 1 and (nesting is None or nesting[0] == 0 and not any(char in string for char in nesting[1]+nesting[2])):
+        #nothing is nested, so str.split does the same job in one pass
+        result = string.split(sep)
+        return [part for part in result if part] if minimal else result
     result = []
     depth = 0
     while True:
@@ -380,7 +645,8 @@ def split(string, sep=None, nesting=None, minimal=False):
             elif nesting is not None and string[i] in nesting[2]:
                 depth -= 1
         else:
-            result.append(string)
+            if string or not minimal:
+                result.append(string)
             break
     return result
 
@@ -4,13 +4,22 @@ Exceptions:
     WordUnchanged -- exception to break out of repeated rule application
 
 Classes:
-    Rule -- represents a sound change rule
+    Rule  -- represents a sound change rule
+    Flags -- collection of the flags of a sound change rule
 
 Functions:
-    parse_ruleset -- parses a sound change ruleset
-    parse_field   -- parse the fields of a rule
-    parse_flags   -- parse the flags of a rule
-    apply_ruleset -- applies a set of sound change rules to a set of words
+    split_rule     -- splits a sound change rule into its fields
+    reverse_fields -- reverses the fields of a sound change rule
+    reverse_syms   -- reverses a sequence in pattern notation
+    compile_env    -- compiles an environment into a function checking it
+    cached_rule    -- parses a sound change rule, reusing earlier results
+    parse_ruleset  -- parses a sound change ruleset
+    parse_field    -- parse the fields of a rule
+    parse_flags    -- parse the flags of a rule
+    apply_ruleset  -- applies a set of sound change rules to a set of words
+    apply_schedule -- applies a schedule of sound change rules to a single word
+    share_schedule -- stores a schedule of sound change rules for a worker process
+    apply_shared   -- applies the stored schedule of sound change rules to a single word
 ''''''
 ==================================== To-do ====================================
 === Bug-fixes ===
@@ -39,12 +48,27 @@ Write docstrings
 Consider where to raise/handle exceptions
 '''
 
-from math import ceil
+import re
+from collections import namedtuple
+from functools import lru_cache
+from itertools import product
+from math import ceil, prod
+from multiprocessing import Pool
+from operator import add, sub
 
-from .core import LangException, Cat, parse_syms, split
+from .core import LangException, FormatError, Cat, Automaton, parse_syms, split
 
 #== Constants ==#
 MAX_RUNS = 10**3 #maximum number of times a rule may be repeated
+MAX_PATTERNS = 10**3 #maximum number of literal sequences a rule's targets may expand to for single-pass matching
+CAT_OPS = {'=': lambda cat, values: values, '+=': add, '-=': sub} #operations for category definitions
+RULE_REGEX = re.compile(r'([+-]?)([^>/!\s]*)(\S*)(?:\s+(\S+))?') #operator, tars, remaining fields, flags
+FIELD_REGEX = re.compile(r'([>/!])([^>/!]*)') #a single field, with its delimiter
+CAT_REGEX = re.compile(r'([^=]*?)([+-]?=)(.*)') #name, operator, values
+CAT_NAME_REGEX = re.compile(r'\[([^\[\],]+)\]') #a named category used in a rule
+
+#== Globals ==#
+_shared = {} #the schedule and automaton apply_ruleset hands to each worker process, so they are only sent once per worker
 
 #== Exceptions ==#
 class WordUnchanged(LangException):
@@ -61,11 +85,18 @@ class Rule():
         envs  -- application environments (list)
         excs  -- exception environments (list)
         else_ -- the rule to apply if an exception is satisfied (Rule)
-        flags -- flags for altering execution (dict)
+        flags -- flags for altering execution (Flags)
     
     Methods:
         apply       -- apply the rule to a word 
-    '''  
+        apply_match -- apply the rule to a single match in a word
+        replace     -- replace a single match in a word
+        replacement -- get the replacement for a single match
+    '''
+    __slots__ = ('rule', 'tars', 'reps', 'envs', 'excs', 'else_', 'flags', '_cats', '_anywhere', '_required', '_env_required',
+                 '_rep_graphs', '_env_checks', '_exc_checks', '_reach', '_replacers', '_sequences', '_literals', '_automaton',
+                 '_lengths') #rulesets may be large, and these are read for every word, so keep them compact
+    
     def __init__(self, rule='', cats=None): #format is tars>reps/envs!excs flag; envs, excs, and flag are all optional
         '''Constructor for Rule
         
@@ -73,129 +104,187 @@ class Rule():
             rule -- the rule as a string
             cats -- list of categories used to interpret the rule 
         '''
-        self.rule = rule
-        if ' ' in rule:
-            rule, flags = rule.split()
-        else:
-            flags = ''
-        if rule[0] == '+':
-            rule = '>'+rule[1:]
-        elif rule[0] == '-':
-            rule = rule[1:]
-        rule = rule.replace('>', ' >').replace('/', ' /').replace('!', ' !').split(' ')
-        tars = rule.pop(0)
-        #We want to extract just the first iteration of (reps, envs, excs) and store everything else in else_
-        #To do this, we observe that if we fill in missing fields once we reach a later field, then if we hit
-        #a repeat (by seeing that the field variable is not None) we are in the second iteration. If there is
-        #no second iteration, else_ will be None.
-        reps = envs = excs = else_ = None
-        for i in range(len(rule)):
-            if rule[i][0] == '>' and reps is None:
-                reps = rule[i][1:]
-                continue
-            if rule[i][0] == '/' and envs is None:
-                envs = rule[i][1:]
-                if reps is None:
-                    reps = ''
-                continue
-            if rule[i][0] == '!' and excs is None:
-                excs = rule[i][1:]
-                if envs is None:
-                    envs = '_'
-                if reps is None:
-                    reps = ''
-                continue
-            else_ = rule[i:]
-            else_.insert(0,tars)
-        if reps is None:
-            reps = ''
-        if envs is None:
-            envs = '_'
-        if excs is None:
-            excs = ''
         if cats is None:
             cats = {}
-        self.tars = parse_field(tars, 'tars', cats)
+        tars, clauses, flags = split_rule(rule)
+        tars = parse_field(tars, 'tars', cats) #shared by the whole chain of else clauses
+        _flags = parse_flags(flags) #else clauses share this rule's flags, so that they are oriented the same way
+        #build the chain of else clauses from the last one back, so that each clause is only parsed once
+        else_ = None
+        for text, reps, envs, excs in reversed(clauses[1:]):
+            _else = Rule.__new__(Rule)
+            _else._build(f'{text} {flags}' if flags else text, tars, reps, envs, excs, else_, _flags, cats)
+            else_ = _else
+        text, reps, envs, excs = clauses[0]
+        self._build(rule, tars, reps, envs, excs, else_, _flags, cats)
+        return
+    
+    def _build(self, rule, tars, reps, envs, excs, else_, flags, cats):
+        '''Fill in a rule from its already-split fields.
+        
+        Arguments:
+            rule  -- the rule as a string (str)
+            tars  -- the parsed target segments (list)
+            reps  -- the replacement segments (str)
+            envs  -- the application environments (str)
+            excs  -- the exception environments (str)
+            else_ -- the rule to apply if an exception is satisfied (Rule)
+            flags -- the parsed flags (Flags)
+            cats  -- the categories used to interpret the rule (dict)
+        '''
+        self.rule = rule
+        self._cats = cats #kept so that the rule can be rebuilt when it is sent to another process
+        self.tars = tars
         self.reps = parse_field(reps, 'reps', cats)
         self.envs = parse_field(envs, 'envs', cats)
         self.excs = parse_field(excs, 'envs', cats)
-        self.flags = parse_flags(flags)
+        self.flags = flags
+        self.else_ = else_
         if not self.reps:
             self.reps = [[]]
         if len(self.reps) < len(self.tars):
             self.reps *= ceil(len(self.tars)/len(self.reps))
-        if else_ is not None:
-            self.else_ = Rule(''.join(else_), cats)
+        #if any environment is empty, every match satisfies the rule's environments and they needn't be checked
+        self._anywhere = [[], []] in self.envs
+        #graphemes that must all be present in a word for each target to match
+        self._required = [frozenset(sym for sym in tar if isinstance(sym, str) and sym != '*') for tar, indices in self.tars] or [frozenset()]
+        #likewise for each environment, and the graphemes replacements could add to a word to satisfy them
+        self._env_required = [frozenset(sym for side in env for sym in side if isinstance(sym, str) and sym != '*') for env in self.envs]
+        self._rep_graphs = frozenset(graph for rep in self.reps for sym in rep for graph in (sym if isinstance(sym, Cat) else [sym]))
+        _tars = self.tars #category substitution pairs graphemes by the targets as written, whichever way they are matched
+        if self.flags.ltr: #the word will be reversed before matching, so reverse the fields to match
+            self.tars, self.reps, self.envs, self.excs = reverse_fields(self.tars, self.reps, self.envs, self.excs)
+        #environments made up only of graphemes can be checked by comparing slices of the word
+        self._env_checks = [compile_env(env) for env in self.envs]
+        self._exc_checks = [compile_env(exc) for exc in self.excs]
+        #how far past the end of a match its environments can look, if that is bounded
+        reaches = [len(env[1]) if len(env) == 2 and all(isinstance(sym, Cat) or isinstance(sym, str) and sym != '*' for sym in env[1]) else None for env in self.envs+self.excs]
+        self._reach = None if None in reaches else max(reaches, default=0)
+        #decide once how each target's replacement is produced, so that replacement needn't inspect the rule each time
+        self._replacers = []
+        first = -1 if self.flags.ltr else 0 #where the first grapheme of the target as written lies in a match
+        for i, rep in enumerate(self.reps):
+            tar = _tars[i][0] if i < len(_tars) else []
+            if len(rep) != 1 or not isinstance(rep[0], Cat): #the replacement is used as-is
+                replacer = lambda _tar, rep=rep: rep
+            elif tar and isinstance(tar[0], Cat): #category substitution - map each grapheme straight to its replacement
+                subs = {}
+                for graph, _graph in zip(tar[0], rep[0]):
+                    subs.setdefault(graph, _graph) #the first occurrence of a grapheme decides its replacement
+                replacer = lambda _tar, subs=subs: [subs[_tar[first]]]
+            else: #a category replacing anything else gives its first member
+                replacer = lambda _tar, rep=rep[0], tar=tar: [rep[tar[0].index(_tar[first])]]
+            self._replacers.append(replacer)
+        #if the targets are made up only of graphemes and categories, list every sequence of graphemes they can match
+        self._sequences = None
+        if self.tars and all(tar and all(isinstance(sym, Cat) or isinstance(sym, str) and sym != '*' for sym in tar) for tar, indices in self.tars):
+            tars = [[list(dict.fromkeys(sym)) if isinstance(sym, Cat) else [sym] for sym in tar] for tar, indices in self.tars]
+            if sum(prod(map(len, tar)) for tar in tars) <= MAX_PATTERNS:
+                self._sequences = [(seq, i) for i, tar in enumerate(tars) for seq in product(*tar)]
+        #targets made up only of graphemes can be found without interpreting pattern notation
+        self._literals = [bool(tar) and all(isinstance(sym, str) and sym != '*' for sym in tar) for tar, indices in self.tars] or [False]
+        #if there are several such targets, they can all be found in one pass
+        if self._sequences is not None and len(self.tars) > 1:
+            self._automaton = Automaton(self._sequences)
+            self._lengths = [len(tar) for tar, indices in self.tars] #every match of a target is as long as the target
         else:
-            self.else_ = None
-        if self.flags['ltr']:
-            self.reverse()
+            self._automaton = None
         return
     
     def __repr__(self):
         return f"Rule('{self!s}')"
     
+    def __reduce__(self): #rules hold functions, so they are pickled as the arguments needed to parse them again
+        return cached_rule, (self.rule, tuple((name, tuple(cat)) for name, cat in self._cats.items()))
+    
     def __str__(self):
         return self.rule
     
-    def reverse(self):
-        for tar in self.tars:
-            tar.reverse()
-        for rep in self.reps:
-            rep.reverse()
-        for env in self.envs:
-            env.reverse()
-            env[0].reverse()
-            if len(env) == 2:
-                env[1].reverse()
-        for exc in self.excs:
-            exc.reverse()
-            exc[0].reverse()
-            if len(exc) == 2:
-                exc[1].reverse()
-        if self.else_ is not None:
-            self.else_.reverse()
-    
-    def apply(self, word):
-        '''Apply the sound change rule to a single word.
+    def apply(self, word, graphs=None):
+        '''Apply the sound change rule to a single word, repeating it as many times as its repeat flag allows.
         
         Arguments:
-            word -- the word to which the rule is to be applied (Word)
+            word   -- the word to which the rule is to be applied (Word)
+            graphs -- the graphemes in the word, if already known (set)
         
         Returns a Word
         
         Raises WordUnchanged if the word was not changed by the rule.
         '''
-        phones = word.phones.copy()
-        if self.flags['ltr']:
+        phones = word.phones #replacements always rebind word.phones, so this is left as it was
+        ltr = self.flags.ltr
+        word.changed = False
+        if graphs is None:
+            graphs = set(phones)
+        if self.else_ is None and not any(graphs.issuperset(required) for required in self._env_required):
+            #no environment can match, unless replacements supply the graphemes it needs
+            available = graphs | self._rep_graphs
+            if not any(available.issuperset(required) for required in self._env_required):
+                raise WordUnchanged
+        if ltr:
             word.reverse()
-        matches = []
         tars = self.tars
         if not tars:
             tars = [([],[])]
-        for i in range(len(tars)):
-            if tars[i]:
-                tar, indices = tars[i]
+        #the rule is repeated until it stops changing the word, without turning the word around between repeats
+        for j in range(self.flags.repeat):
+            before = word.phones
+            matches = []
+            if self._automaton is not None: #find every target at once
+                found = [[] for tar in tars]
+                _phones, lengths = word.phones, self._lengths
+                for index, i in self._automaton.find_all(_phones):
+                    found[i].append((index, _phones[index:index+lengths[i]], i))
+            for i in range(len(tars)):
+                if tars[i]:
+                    tar, indices = tars[i]
+                else:
+                    tar, indices = [], []
+                if self._automaton is not None:
+                    _matches = found[i]
+                elif self._literals[i]: #only graphemes, so every match can be found without interpreting pattern notation
+                    _phones, length = word.phones, len(tar)
+                    _matches = [(index, _phones[index:index+length], i) for index in word.find_all_literal(tar)]
+                else:
+                    _matches = []
+                    if not tar and word.phones[:1] == ['#']: #epenthesis can't insert before the leading boundary
+                        index = 1
+                    else:
+                        index = 0
+                    while True:
+                        match, _tar = word.find(tar, index, return_match=True) #find the next place where tar matches
+                        if match == -1: #no more matches
+                            break
+                        index += match
+                        _matches.append((index, _tar, i))
+                        index += 1
+                if indices: #a word may have fewer matches than an index asks for, in which case that index picks none
+                    matches += [_matches[i] for i in indices if -len(_matches) <= i < len(_matches)]
+                else:
+                    matches += _matches
+            matches.sort(reverse=True)
+            unconditional, bounded = self._anywhere and not self.excs, self.else_ is None and self._reach is not None
+            if unconditional or bounded: #the smallest gap between consecutive matches, or -1 if two start together
+                gap = min((a[0]-b[0]-len(b[1]) if b[0] < a[0] else -1 for a, b in zip(matches, matches[1:])), default=float('inf'))
+            if unconditional and gap >= 0:
+                #every match will be replaced, and none affects another, so they can all be spliced in at once
+                word.replace_all([(match[0], match[1], self.replacement(match)) for match in reversed(matches)])
+            elif bounded and gap >= self._reach:
+                #replacing one match can't change whether another's environments match, so check them all first and splice in once
+                envs, excs = self._env_checks, self._exc_checks
+                word.replace_all([(index, tar, self.replacement((index, tar, i))) for index, tar, i in reversed(matches)
+                    if not any(check(word, index, tar) for check in excs) and (self._anywhere or any(check(word, index, tar) for check in envs))])
             else:
-                tar, indices = [], []
-            _matches = []
-            index = 0
-            while True:
-                match, _tar = word.find(tar, index, return_match=True) #find the next place where tar matches
-                if match == -1: #no more matches
-                    break
-                index += match
-                _matches.append((index, _tar, i))
-                index += 1
-            if not indices:
-                indices = range(len(_matches))
-            matches += [_matches[i] for i in indices]
-        matches = sorted(matches, reverse=True)
-        for match in matches:
-            self.apply_match(match, word)
-        if self.flags['ltr']:
-            word.reverse()
-        if word.phones == phones:
+                for match in matches:
+                    self.apply_match(match, word)
+            if word.phones is before or word.phones == before: #this repeat changed nothing, so no later one will
+                break
+        if ltr:
+            if word.changed:
+                word.reverse()
+            else: #nothing was replaced, so the original orientation can be restored without reversing again
+                word.phones = phones
+        if word.phones is phones or word.phones == phones: #phones is only rebound if some part of it was changed
             raise WordUnchanged
         return word
     
@@ -206,34 +295,153 @@ class Rule():
             match -- the match to be checked
             word  -- the word to check against
         '''
-        reps = self.reps.copy()
         index, tar, i = match
         if self.excs: #might need improvement
-            for exc in self.excs: #if any exception matches, try checking else_
-                if word.match_env(exc, index, tar):
+            for check in self._exc_checks: #if any exception matches, try checking else_
+                if check(word, index, tar):
                     if self.else_ is not None:
                         self.else_.apply_match(match, word)
                     return
-            for env in self.envs: #if any environment matches, return the match
-                if word.match_env(env, index, tar):
-                    rep = reps[i]
-                    if len(rep) == 1 and isinstance(rep[0], Cat):
-                        rep[0] = rep[0][self.tars[i][0][0].index(tar[0])]
-                    word.replace(index, tar, rep)
-                    return
-            #rule failed
+            if self._anywhere or any(check(word, index, tar) for check in self._env_checks): #if any environment matches, apply the match
+                self.replace(match, word)
+            #otherwise the rule failed
         else:
-            for env in self.envs: #if any environment matches, return the match
-                if word.match_env(env, index, tar):
-                    rep = self.reps[i]
-                    if len(rep) == 1 and isinstance(rep[0], Cat):
-                        rep[0] = rep[0][self.tars[i][0][0].index(tar[0])]
-                    word.replace(index, tar, rep)
-                    return
-            if self.else_ is not None: #try checking else_
+            if self._anywhere or any(check(word, index, tar) for check in self._env_checks): #if any environment matches, apply the match
+                self.replace(match, word)
+            elif self.else_ is not None: #try checking else_
                 self.else_.apply_match(match, word)
+    
+    def replace(self, match, word):
+        '''Replace a match in a word.
+        
+        Arguments:
+            match -- the match to be replaced
+            word  -- the word to replace it in
+        '''
+        index, tar, i = match
+        word.replace(index, tar, self.replacement(match))
+    
+    def replacement(self, match):
+        '''Get the replacement for a match.
+        
+        Arguments:
+            match -- the match to be replaced
+        
+        Returns a list
+        '''
+        index, tar, i = match
+        return self._replacers[i](tar)
+
+Flags = namedtuple('Flags', 'ignore, ltr, repeat, age')
 
 #== Functions ==#
+def split_rule(rule):
+    '''Split a sound change rule into its fields.
+    
+    Arguments:
+        rule -- the rule to be split (str)
+    
+    Returns a tuple of the tars string, a list of clauses, and the flags string. Each clause is a tuple of its text
+    (including the clauses after it) and its reps, envs and excs strings; every clause after the first is the else
+    clause of the one before it.
+    
+    Raises FormatError if the rule is badly formatted.
+    '''
+    match = RULE_REGEX.fullmatch(rule)
+    if match is None:
+        raise FormatError(f'invalid sound change rule: {rule!r}')
+    op, tars, fields, flags = match.group(1, 2, 3, 4)
+    if op == '+': #epenthesis - everything before the first delimiter is actually the replacement
+        tars, fields = '', '>'+tars+fields
+    fields = FIELD_REGEX.findall(fields)
+    #We want to split the fields into iterations of (reps, envs, excs), each being the else clause of the last
+    #To do this, we observe that if we fill in missing fields once we reach a later field, then if we hit
+    #a repeat (by seeing that the field variable is not None) we are in the next iteration.
+    clauses = []
+    reps = envs = excs = None
+    start = 0
+    for i, (delim, field) in enumerate(fields+[(None, None)]): #the sentinel closes the last clause
+        if delim == '>' and reps is None:
+            reps = field
+        elif delim == '/' and envs is None:
+            envs = field
+            if reps is None:
+                reps = ''
+        elif delim == '!' and excs is None:
+            excs = field
+            if envs is None:
+                envs = '_'
+            if reps is None:
+                reps = ''
+        else:
+            text = tars+''.join(delim+field for delim, field in fields[start:]) #the clause, followed by its own else clauses
+            clauses.append((text, reps or '', '_' if envs is None else envs, excs or ''))
+            reps = envs = excs = None
+            start = i
+            if delim == '>':
+                reps = field
+            elif delim == '/':
+                reps, envs = '', field
+            elif delim == '!':
+                reps, envs, excs = '', '_', field
+    return tars, clauses, flags or ''
+
+def reverse_fields(tars, reps, envs, excs):
+    '''Reverse the fields of a sound change rule, for matching against a reversed word.
+    
+    Arguments:
+        tars -- target segments (list)
+        reps -- replacement segments (list)
+        envs -- application environments (list)
+        excs -- exception environments (list)
+    
+    Returns a tuple of new tars, reps, envs and excs; the originals are left untouched.
+    '''
+    tars = [(reverse_syms(tar), indices) for tar, indices in tars]
+    reps = [reverse_syms(rep) for rep in reps]
+    #the left side is already stored closest-first, like the right side, so the two sides only need to swap over
+    envs = [[env[1], env[0]] if len(env) == 2 else [reverse_syms(env[0])] for env in envs]
+    excs = [[exc[1], exc[0]] if len(exc) == 2 else [reverse_syms(exc[0])] for exc in excs]
+    return tars, reps, envs, excs
+
+def reverse_syms(syms):
+    '''Reverse a sequence in pattern notation, including the sequences in its optional parts.
+    
+    Arguments:
+        syms -- the sequence to be reversed (list)
+    
+    Returns a list
+    '''
+    return [tuple(reverse_syms(sym)) if isinstance(sym, tuple) else sym for sym in reversed(syms)]
+
+def compile_env(env):
+    '''Compile a sound change environment into a function checking it against a word.
+    
+    Arguments:
+        env -- the environment to be compiled (list)
+    
+    Returns a function taking the word, the index of the match and the matched graphemes, and returning a bool
+    '''
+    if len(env) != 2 or not all(isinstance(sym, str) and sym != '*' for side in env for sym in side):
+        return lambda word, pos, tar: word.match_env(env, pos, tar)
+    left, right = env[0][::-1], env[1] #env[0] is stored reversed
+    def check(word, pos, tar):
+        end = pos+len(tar)
+        return pos >= len(left) and word.phones[pos-len(left):pos] == left and word.phones[end:end+len(right)] == right
+    return check
+
+@lru_cache(maxsize=4096)
+def cached_rule(rule, cats):
+    '''Parse a sound change rule, reusing the result if the same rule has been parsed with the same categories before.
+    
+    Arguments:
+        rule -- the rule to be parsed (str)
+        cats -- the categories used to interpret the rule, as (name, values) pairs (tuple)
+    
+    Returns a Rule
+    '''
+    return Rule(rule, {name: Cat(list(values)) for name, values in cats})
+
 def parse_ruleset(ruleset, cats=None):
     '''Parse a sound change ruleset.
     
@@ -242,34 +450,35 @@ def parse_ruleset(ruleset, cats=None):
         cats    -- the initial categories to be used to parse the rules
     
     Returns a list.
+    
+    Raises FormatError if a category definition is badly formatted.
     '''
     if cats is None:
         cats = {}
     if isinstance(ruleset, str):
         ruleset = ruleset.splitlines()
-    else:
-        ruleset = ruleset.copy()
-    for i in range(len(ruleset)):
-        rule = ruleset[i]
+    _ruleset = []
+    for rule in ruleset:
         if rule == '':
-            ruleset[i] = None
-        elif isinstance(rule, Rule):
             continue
+        elif isinstance(rule, Rule):
+            pass
         elif '>' in rule or rule[0] in '+-': #rule is a sound change
-            ruleset[i] = Rule(rule, cats)
+            #only the categories the rule names can affect it, so the cache is keyed on those alone
+            names = dict.fromkeys(CAT_NAME_REGEX.findall(rule))
+            rule = cached_rule(rule, tuple((name, tuple(cats[name])) for name in names if name in cats))
         else: #rule is a cat definition
-            cop = rule.index('=')
-            op = (rule[cop-1] if rule[cop-1] in '+-' else '') + '='
-            name, vals = rule.split(op)
-            exec(f'cats[name] {op} Cat(vals)')
-            for cat in list(cats): #discard blank categories
-                if not cats[cat]:
-                    del cats[cat]
-            ruleset[i] = None
-    for i in reversed(range(len(ruleset))):
-        if ruleset[i] is None or ruleset[i].flags['ignore']:
-            del ruleset[i]
-    return ruleset
+            match = CAT_REGEX.fullmatch(rule)
+            if match is None:
+                raise FormatError(f'invalid category definition: {rule!r}')
+            name, op, vals = match.groups()
+            cats[name] = CAT_OPS[op](cats.get(name, Cat()), Cat(vals)) #an undefined category starts out empty
+            if not cats[name]: #discard blank categories
+                del cats[name]
+            continue
+        if not rule.flags.ignore:
+            _ruleset.append(rule)
+    return _ruleset
     
 def parse_field(field, mode, cats=None):
     '''Parse a field of a sound change rule.
@@ -285,12 +494,12 @@ def parse_field(field, mode, cats=None):
         cats = {}
     _field = []
     if mode == 'envs':
-        for env in split(field, '|', minimal=True):
+        for env in [env for env in field.split('|') if env]:
             if '~' in env: #~X is equivalent to X_,_X
                 _field += Rule.parse_field('{0}_|_{0}'.format(envs[1:]), 'envs', cats)
             elif '_' in env:
                 env = env.split('_')
-                env = [parse_syms(env[0], cats)[::-1] if env[0] else [], parse_syms(env[1], cats) if env[1] else []]
+                env = [reverse_syms(parse_syms(env[0], cats)) if env[0] else [], parse_syms(env[1], cats) if env[1] else []]
             else:
                 env = [parse_syms(env, cats) if env else []]
             _field.append(env)
@@ -299,9 +508,7 @@ def parse_field(field, mode, cats=None):
             if mode == 'tars':
                 if '@' in tar:
                     tar, index = tar.split('@')
-                    indices = split(index, '|', minimal=True)
-                    for i in range(len(indices)):
-                        indices[i] = int(indices[i])
+                    indices = [int(index) for index in index.split('|') if index]
                 else:
                     indices = []
             tar = parse_syms(tar, cats) if tar else []
@@ -316,52 +523,110 @@ def parse_flags(flags):
     Arguments:
         flags -- the flags to be parsed
         
-    Returns a dictionary.
+    Returns a Flags.
+    
+    Raises FormatError if a flag is not recognised.
     '''
     _flags = {'ignore':0, 'ltr':0, 'repeat':1, 'age':1} #default values
-    for flag in split(flags, ';', minimal=True):
-        if ':' in flag:
-            flag, arg = flag.split(':')
-            _flags[flag] = int(arg)
+    for flag in flags.split(';'):
+        if not flag:
+            continue
+        name, colon, arg = flag.partition(':')
+        if name not in _flags:
+            raise FormatError(f'invalid flag: {flag!r}')
+        if colon:
+            _flags[name] = int(arg)
         else:
-            _flags[flag] = 1-_flags[flag]
+            _flags[name] = 1-_flags[name]
     if not 0 < _flags['repeat'] <= MAX_RUNS:
         _flags['repeat'] = MAX_RUNS
     if not 0 < _flags['age'] <= MAX_RUNS:
         _flags['age'] = MAX_RUNS
-    return _flags
+    return Flags(**_flags)
 
-def apply_ruleset(words, ruleset, cats=None, debug=False):
+def apply_ruleset(words, ruleset, cats=None, debug=False, processes=None):
     '''Applies a set of sound change rules to a set of words.
     
     Arguments:
-        words   -- the words to which the rules are to be applied (list)
-        ruleset -- the rules which are to be applied to the words (list)
-        cats    -- the initial categories to be used in ruleset parsing (dict)
+        words     -- the words to which the rules are to be applied (list)
+        ruleset   -- the rules which are to be applied to the words (list)
+        cats      -- the initial categories to be used in ruleset parsing (dict)
+        debug     -- whether to print each word and rule as they are reached; nothing is formatted otherwise (bool)
+        processes -- how many processes to share the words between; the given words are left unchanged if more than one (int)
     
     Returns a list.
     '''
-    words = words.copy()
     if cats is None:
         cats = {}
     ruleset = parse_ruleset(ruleset, cats)
-    rules = [] #we use a list to store rules, since they may be applied multiple times
+    #First work out the order rules are run in - rules may be applied multiple times, according to their age.
+    #This is worked out once for all words, and steps are laid end to end, since each word runs through every step.
+    #Ages are tracked here rather than in the rules' flags so that parsed rules are left untouched.
+    schedule = []
+    rules = [] #we use a list to store rules paired with their remaining age, since they may be applied multiple times
     for rule in ruleset:
-        rules.append(rule)
+        rules.append((rule, rule.flags.age))
+        schedule.extend(rule for rule, age in reversed(rules))
+        rules = [(rule, age-1) for rule, age in rules if age > 1] #age every rule at once, discarding those that have 'expired'
+    #Rules whose targets are all sequences of graphemes can be looked for together in a single pass over the word
+    automaton = Automaton((seq[::-1] if rule.flags.ltr else seq, rule) for rule in ruleset if rule._sequences is not None for seq, j in rule._sequences)
+    #Then run each word through the whole schedule in turn - words don't affect each other, so they can be shared between processes
+    if processes is None or processes < 2 or debug:
+        return [apply_schedule(word, schedule, automaton, debug) for word in words]
+    with Pool(processes, initializer=share_schedule, initargs=(schedule, automaton)) as pool:
+        return pool.map(apply_shared, words, chunksize=max(1, len(words)//(processes*4)))
+
+def share_schedule(schedule, automaton):
+    '''Store a schedule of sound change rules for the words this process is given.
+    
+    Arguments:
+        schedule  -- the rules in the order they are to be applied (list)
+        automaton -- finds which of the rules have a target in a word, keyed by rule (Automaton)
+    '''
+    _shared['schedule'] = schedule
+    _shared['automaton'] = automaton
+
+def apply_shared(word):
+    '''Applies the schedule of sound change rules stored by share_schedule to a single word.
+    
+    Arguments:
+        word -- the word to which the rules are to be applied (Word)
+    
+    Returns a Word.
+    '''
+    return apply_schedule(word, _shared['schedule'], _shared['automaton'])
+
+def apply_schedule(word, schedule, automaton, debug=False):
+    '''Applies a schedule of sound change rules to a single word.
+    
+    Arguments:
+        word      -- the word to which the rules are to be applied (Word)
+        schedule  -- the rules in the order they are to be applied (list)
+        automaton -- finds which of the rules have a target in the word, keyed by rule (Automaton)
+        debug     -- whether to print the word and each rule as they are reached (bool)
+    
+    Returns a Word.
+    '''
+    if debug:
+        print('Word =',word) #for debugging
+    #the rules with a target in the word, and the word's graphemes, found when first needed and discarded whenever the word changes
+    found = graphs = None
+    for rule in schedule:
         if debug:
-            print('Words =',[str(word) for word in words]) #for debugging
-        for i in range(len(words)):
-            for rule in reversed(rules):
-                if debug:
-                    print('rule =',rule) #for debugging
-                for j in range(rule.flags['repeat']):
-                    try:
-                        words[i] = rule.apply(words[i])
-                    except WordUnchanged: #if the word didn't change, stop applying
-                        break
-        for i in reversed(range(len(rules))):
-            rules[i].flags['age'] -= 1
-            if rules[i].flags['age'] == 0: #if the rule has 'expired', discard it
-                del rules[i]
-    return words
+            print('rule =',rule) #for debugging
+        if rule._sequences is not None:
+            if found is None:
+                found = automaton.find_keys(word.phones)
+            if rule not in found: #none of the rule's targets are in the word, so it can't apply
+                continue
+        if graphs is None: #the rule needs these too, so they are only gathered once for each version of the word
+            graphs = set(word.phones)
+        if rule._sequences is None and not any(graphs.issuperset(required) for required in rule._required):
+            continue #otherwise, the word must at least contain every grapheme some target needs
+        try:
+            word = rule.apply(word, graphs)
+        except WordUnchanged:
+            continue
+        found = graphs = None
+    return word
 
@@ -23,6 +23,189 @@ class TestMainChange(unittest.TestCase):
         changed_word = str(rule.apply(word))
         self.assertEqual(changed_word, 'a')
 
+    def test_split_empty_string(self):
+        self.assertEqual(conlanger.core.split('', minimal=True), [])
+
+    def test_addition_after_leading_boundary(self):
+        rule = conlanger.sce.Rule(rule='+b/_#')
+        word = conlanger.core.Word(lexeme='a')
+        self.assertEqual(rule.apply(word).phones, ['#', 'a', 'b', '#'])
+
+    def test_category_change(self):
+        rule = conlanger.sce.Rule(rule='[p,t]>[b,d]')
+        word = conlanger.core.Word(lexeme='pat')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'bad')
+
+    def test_ltr_change(self):
+        rule = conlanger.sce.Rule(rule='a>b/b_ ltr')
+        word = conlanger.core.Word(lexeme='baa')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'bbb')
+
+    def test_rtl_change(self):
+        rule = conlanger.sce.Rule(rule='a>b/b_')
+        word = conlanger.core.Word(lexeme='baa')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'bba')
+
+    def test_ltr_category_change(self):
+        rule = conlanger.sce.Rule(rule='[p,t]a>[b,d] ltr')
+        word = conlanger.core.Word(lexeme='ta')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'd')
+
+    def test_index_out_of_range(self):
+        rule = conlanger.sce.Rule(rule='a@1>b/x_')
+        word = conlanger.core.Word(lexeme='xa')
+        with self.assertRaises(conlanger.sce.WordUnchanged):
+            rule.apply(word)
+
+    def test_pooled_ruleset(self):
+        ruleset = ['a>b/c_', '[p,t]>[b,d]', '+e/_#']
+        words = [conlanger.core.Word(lexeme='capatac'*n) for n in range(1, 9)]
+        serial = conlanger.sce.apply_ruleset([word.copy() for word in words], ruleset)
+        pooled = conlanger.sce.apply_ruleset(words, ruleset, processes=2)
+        self.assertEqual([str(word) for word in pooled], [str(word) for word in serial])
+
+    def test_else_change(self):
+        rule = conlanger.sce.Rule(rule='a>b/c_>d/e_')
+        word = conlanger.core.Word(lexeme='ea')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(str(rule.else_), 'a>d/e_')
+        self.assertEqual(changed_word, 'ed')
+
+    def test_chained_else_change(self):
+        rule = conlanger.sce.Rule(rule='a>b/c_>d/e_>f/g_')
+        word = conlanger.core.Word(lexeme='ga')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(str(rule.else_.else_), 'a>f/g_')
+        self.assertEqual(changed_word, 'gf')
+
+    def test_automaton_find_all(self):
+        automaton = conlanger.core.Automaton([(['a', 'b'], 'ab'), (['b'], 'b')])
+        found = list(automaton.find_all(list('abab')))
+        self.assertEqual(found, [(0, 'ab'), (1, 'b'), (2, 'ab'), (3, 'b')])
+
+    def test_undefined_category_addition(self):
+        cats = {}
+        conlanger.sce.parse_ruleset(['V+=a,e'], cats)
+        self.assertEqual(list(cats['V']), ['a', 'e'])
+
+    def test_strip_boundaries_only(self):
+        word = conlanger.core.Word(lexeme=['#', '#'])
+        self.assertEqual(word.strip().phones, [])
+
+    def test_nested_category(self):
+        cat = conlanger.core.Cat([conlanger.core.Cat('a,b'), 'c'])
+        self.assertEqual(list(cat), ['a', 'b', 'c'])
+
+    def test_invalid_category_definition(self):
+        with self.assertRaises(conlanger.core.FormatError):
+            conlanger.sce.parse_ruleset(['V'])
+
+    def test_invalid_flag(self):
+        with self.assertRaises(conlanger.core.FormatError):
+            conlanger.sce.Rule(rule='a>b foo')
+
+    def test_ltr_long_environments(self):
+        for rule, lexeme, result in [('a>c/ab_ ltr', 'abab', 'abcb'), ('a>c/_ba ltr', 'abab', 'cbab'),
+                                     ('a>c!xy_ ltr', 'xyaa', 'xyac'), ('a>c!_yx ltr', 'aayx', 'cayx')]:
+            rule = conlanger.sce.Rule(rule=rule)
+            word = conlanger.core.Word(lexeme=lexeme)
+            changed_word = str(rule.apply(word))
+            self.assertEqual(changed_word, result)
+
+    def test_ltr_boundary_environment(self):
+        rule = conlanger.sce.Rule(rule='a>c/a#_ ltr')
+        word = conlanger.core.Word(lexeme='aab')
+        with self.assertRaises(conlanger.sce.WordUnchanged):
+            rule.apply(word)
+
+    def test_ltr_optional_change(self):
+        for rule, lexeme, result in [('a(bc)>x ltr', 'abc', 'x'), ('(bc)a>x ltr', 'bca', 'x'), ('a>x/d(bc)_ ltr', 'dbca', 'dbcx')]:
+            rule = conlanger.sce.Rule(rule=rule)
+            word = conlanger.core.Word(lexeme=lexeme)
+            changed_word = str(rule.apply(word))
+            self.assertEqual(changed_word, result)
+
+    def test_repeat_flag(self):
+        rule = conlanger.sce.Rule(rule='ab>ba repeat:2')
+        word = conlanger.core.Word(lexeme='aaab')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'abaa')
+
+    def test_repeat_flag_stops_early(self):
+        rule = conlanger.sce.Rule(rule='ab>ba repeat:5')
+        word = conlanger.core.Word(lexeme='aab')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'baa')
+
+    def test_age_flag(self):
+        words = [conlanger.core.Word(lexeme='ac')]
+        aged = conlanger.sce.apply_ruleset(words, ['a>b age:2', 'c>a'])
+        self.assertEqual(str(aged[0]), 'bb')
+        words = [conlanger.core.Word(lexeme='ac')]
+        unaged = conlanger.sce.apply_ruleset(words, ['a>b', 'c>a'])
+        self.assertEqual(str(unaged[0]), 'ba')
+
+    def test_ignore_flag(self):
+        words = [conlanger.core.Word(lexeme='ac')]
+        changed_words = conlanger.sce.apply_ruleset(words, ['a>b ignore'])
+        self.assertEqual(str(changed_words[0]), 'ac')
+
+    def test_several_literal_targets(self):
+        rule = conlanger.sce.Rule(rule='abc,bd>x,y')
+        for lexeme, result in [('abcbd', 'xy'), ('abd', 'ay'), ('abcd', 'xd')]:
+            word = conlanger.core.Word(lexeme=lexeme)
+            changed_word = str(rule.apply(word))
+            self.assertEqual(changed_word, result)
+
+    def test_pattern_environments(self):
+        for rule, lexeme, result in [('a>x/_(b)c', 'abc', 'xbc'), ('a>x/_(b)c', 'ac', 'xc'), ('a>x/_(b)c', 'adc', None),
+                                     ('a>x/c(b)_', 'cba', 'cbx'), ('a>x/c(b)_', 'ca', 'cx'), ('a>x/c(b)_', 'cda', None),
+                                     ('a>x/_*c', 'abbc', 'xbbc'), ('a>x/_*c', 'abbd', None), ('a>x/c*_', 'cbba', 'cbbx'),
+                                     ('a>x/_**c', 'abbc', 'xbbc'), ('a>x/_**c', 'abbd', None),
+                                     ('a>x/[b,c]_', 'ca', 'cx'), ('a>x/[b,c]_', 'da', None), ('a>x/_[b,c]', 'ab', 'xb'),
+                                     ('a>x/_#[b,c]', 'cba', None)]:
+            rule = conlanger.sce.Rule(rule=rule)
+            word = conlanger.core.Word(lexeme=lexeme)
+            if result is None:
+                with self.assertRaises(conlanger.sce.WordUnchanged):
+                    rule.apply(word)
+            else:
+                changed_word = str(rule.apply(word))
+                self.assertEqual(changed_word, result)
+
+    def test_mixed_environments(self):
+        rule = conlanger.sce.Rule(rule='a>x/b_|[c,d]_|_*e')
+        word = conlanger.core.Word(lexeme='ba ca da ea ae')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'bx cx dx ex xe')
+        word = conlanger.core.Word(lexeme='fa')
+        with self.assertRaises(conlanger.sce.WordUnchanged):
+            rule.apply(word)
+
+    def test_category_membership_after_change(self):
+        cat = conlanger.core.Cat('a,b')
+        cat.append('c')
+        cat[0] = 'd'
+        cat += ['e']
+        del cat[1]
+        self.assertEqual([value in cat for value in 'abcde'], [False, False, True, True, True])
+
+    def test_copy_replacement(self):
+        rule = conlanger.sce.Rule(rule='ab>%c')
+        word = conlanger.core.Word(lexeme='abxab')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'abcxabc')
+
+    def test_metathesis_replacement(self):
+        rule = conlanger.sce.Rule(rule='ab><')
+        word = conlanger.core.Word(lexeme='abxab')
+        changed_word = str(rule.apply(word))
+        self.assertEqual(changed_word, 'baxba')
+
 
 suite = unittest.TestLoader().loadTestsFromTestCase(TestMainChange)
 unittest.TextTestRunner(verbosity=2).run(suite)